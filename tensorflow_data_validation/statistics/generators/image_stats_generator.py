@@ -192,6 +192,11 @@ class _PartialImageStats(object):
       value_lists have inconsistent formats.
   """
 
+  __slots__ = [
+      'total_num_values', 'max_width', 'max_height', 'counter_by_format',
+      'invalidate'
+  ]
+
   def __init__(self):
     self.total_num_values = 0
     self.max_width = 0
@@ -60,6 +60,8 @@ _NL_MATCH_RATIO = 'natural_language_match_rate'
 class _PartialNLStats(object):
   """Partial feature stats for natural language."""
 
+  __slots__ = ['matched', 'considered', 'invalidate']
+
   def __init__(self, matched: int = 0, considered: int = 0,
                invalidate=False) -> None:
     # The total number of values matching natural language heuristic.
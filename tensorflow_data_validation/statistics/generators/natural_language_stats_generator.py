@@ -76,6 +76,11 @@ def _sort_and_truncate_reported_sequence(sequence: List[_ReportedSequence]):
 class _TokenStats(object):
   """Tracks statistics for individual tokens."""
 
+  __slots__ = [
+      'frequency', 'num_sequences', 'per_sequence_min_frequency',
+      'per_sequence_max_frequency', 'positions'
+  ]
+
   def __init__(self):
     self.frequency = 0
     self.num_sequences = 0
@@ -104,6 +109,15 @@ class _TokenStats(object):
 class _PartialNLStats(object):
   """Partial feature stats for natural language."""
 
+  __slots__ = [
+      'invalidate', 'num_in_vocab_tokens', 'total_num_tokens',
+      'sum_in_vocab_token_lengths', 'num_examples',
+      'vocab_token_length_quantiles', 'min_sequence_length',
+      'max_sequence_length', 'sequence_length_quantiles',
+      'token_occurrence_counts', 'token_statistics',
+      'reported_sequences_coverage', 'reported_sequences_avg_token_length'
+  ]
+
   def __init__(self,
                invalidate=False,
                num_in_vocab_tokens: int = 0,
@@ -13,10 +13,6 @@
 # limitations under the License.
 """Base classes for statistics generators."""
 
-from __future__ import absolute_import
-from __future__ import division
-from __future__ import print_function
-
 import abc
 from typing import Any, Dict, Generic, Hashable, Iterable, List, Optional, Text, TypeVar
 
@@ -78,7 +74,8 @@ class StatsGenerator(object):
 ACCTYPE = TypeVar('ACCTYPE')
 
 
-class CombinerStatsGenerator(Generic[ACCTYPE], StatsGenerator):
+class CombinerStatsGenerator(
+    Generic[ACCTYPE], StatsGenerator, metaclass=abc.ABCMeta):
   """A StatsGenerator which computes statistics using a combiner function.
 
   This class computes statistics using a combiner function. It emits partial
@@ -103,6 +100,9 @@ class CombinerStatsGenerator(Generic[ACCTYPE], StatsGenerator):
   Compute statistics from the partial state in the accumulator and
   return the result as a DatasetFeatureStatistics proto.
       extract_output(accumulator)
+
+  add_input is the hot path; prefer whole-column helpers such as those in
+  tfx_bsl.arrow.array_util and arrow_util over per-row Python loops.
   """
 
   # TODO(b/176939874): Investigate which stats generators will benefit from
@@ -117,14 +117,15 @@ class CombinerStatsGenerator(Generic[ACCTYPE], StatsGenerator):
     """
     pass
 
+  @abc.abstractmethod
   def create_accumulator(self) -> ACCTYPE:
     """Returns a fresh, empty accumulator.
 
     Returns:
       An empty accumulator.
     """
-    raise NotImplementedError
 
+  @abc.abstractmethod
   def add_input(self, accumulator: ACCTYPE,
                 input_record_batch: pa.RecordBatch) -> ACCTYPE:
     """Returns result of folding a batch of inputs into accumulator.
@@ -140,21 +141,25 @@ class CombinerStatsGenerator(Generic[ACCTYPE], StatsGenerator):
     Returns:
       The accumulator after updating the statistics for the batch of inputs.
     """
-    raise NotImplementedError
 
+  @abc.abstractmethod
   def merge_accumulators(self, accumulators: Iterable[ACCTYPE]) -> ACCTYPE:
     """Merges several accumulators to a single accumulator value.
 
     Note: mutating any element in `accumulators` except for the first is not
     allowed. The first element may be modified and returned for efficiency.
 
+    The merge must be associative and commutative, with create_accumulator()
+    as its identity. Beam relies on this to pre-combine partial accumulators
+    before the shuffle (combiner lifting) and to fan out hot keys, so the
+    accumulators may be merged in any grouping and order.
+
     Args:
       accumulators: The accumulators to merge.
 
     Returns:
       The merged accumulator.
     """
-    raise NotImplementedError
 
   # TODO(b/176939874): Investigate which stats generators will benefit from
   # compact.
@@ -172,6 +177,7 @@ class CombinerStatsGenerator(Generic[ACCTYPE], StatsGenerator):
     """
     return accumulator
 
+  @abc.abstractmethod
   def extract_output(
       self, accumulator: ACCTYPE) -> statistics_pb2.DatasetFeatureStatistics:
     """Returns result of converting accumulator into the output value.
@@ -182,13 +188,13 @@ class CombinerStatsGenerator(Generic[ACCTYPE], StatsGenerator):
     Returns:
       A proto representing the result of this stats generator.
     """
-    raise NotImplementedError
 
   # TODO(b/176939874): Add teardown() to all StatsGenerators if/when it is
   # needed.
 
 
-class CombinerFeatureStatsGenerator(Generic[ACCTYPE], StatsGenerator):
+class CombinerFeatureStatsGenerator(
+    Generic[ACCTYPE], StatsGenerator, metaclass=abc.ABCMeta):
   """Generate feature level statistics using combiner function.
 
   This interface is a simplification of CombinerStatsGenerator for the special
@@ -206,14 +212,15 @@ class CombinerFeatureStatsGenerator(Generic[ACCTYPE], StatsGenerator):
     """
     pass
 
+  @abc.abstractmethod
   def create_accumulator(self) -> ACCTYPE:
     """Returns a fresh, empty accumulator.
 
     Returns:
       An empty accumulator.
     """
-    raise NotImplementedError
 
+  @abc.abstractmethod
   def add_input(self, accumulator: ACCTYPE, feature_path: types.FeaturePath,
                 feature_array: pa.Array) -> ACCTYPE:
     """Returns result of folding a batch of inputs into accumulator.
@@ -227,18 +234,20 @@ class CombinerFeatureStatsGenerator(Generic[ACCTYPE], StatsGenerator):
     Returns:
       The accumulator after updating the statistics for the batch of inputs.
     """
-    raise NotImplementedError
 
+  @abc.abstractmethod
   def merge_accumulators(self, accumulators: Iterable[ACCTYPE]) -> ACCTYPE:
     """Merges several accumulators to a single accumulator value.
 
+    As for CombinerStatsGenerator, the merge must be associative and
+    commutative.
+
     Args:
       accumulators: The accumulators to merge.
 
     Returns:
       The merged accumulator.
     """
-    raise NotImplementedError
 
   def compact(self, accumulator: ACCTYPE) -> ACCTYPE:
     """Returns a compact representation of the accumulator.
@@ -254,6 +263,7 @@ class CombinerFeatureStatsGenerator(Generic[ACCTYPE], StatsGenerator):
     """
     return accumulator
 
+  @abc.abstractmethod
   def extract_output(
       self, accumulator: ACCTYPE) -> statistics_pb2.FeatureNameStatistics:
     """Returns result of converting accumulator into the output value.
@@ -264,7 +274,6 @@ class CombinerFeatureStatsGenerator(Generic[ACCTYPE], StatsGenerator):
     Returns:
       A proto representing the result of this stats generator.
     """
-    raise NotImplementedError
 
 
 CONSTITUENT_ACCTYPE = TypeVar('CONSTITUENT_ACCTYPE')
@@ -211,6 +211,8 @@ _TIME_RE_LIST = list(_build_all_formats_regexes(_build_all_formats()))
 class _PartialTimeStats(object):
   """Partial feature stats for dates/times."""
 
+  __slots__ = ['considered', 'invalidated', 'matching_formats']
+
   def __init__(self, considered: int = 0, invalidated: bool = False) -> None:
     # The total number of values considered for classification.
     self.considered = considered
@@ -33,6 +33,7 @@ from tensorflow_data_validation.utils import stats_util
 from tensorflow_data_validation.utils import top_k_uniques_stats_util
 from tensorflow_data_validation.utils.example_weight_map import ExampleWeightMap
 
+from tfx_bsl.arrow import array_util
 from tfx_bsl.sketches import KmvSketch
 from tfx_bsl.sketches import MisraGriesSketch
 
@@ -230,14 +231,16 @@ class TopKUniquesSketchStatsGenerator(stats_generator.CombinerStatsGenerator):
         leaf_array: pa.Array):
       if np.random.random() > self._length_counter_sampling_rate: return
       if feature_type == statistics_pb2.FeatureNameStatistics.STRING:
-        distinct_count = collections.defaultdict(int)
         values, _ = arrow_util.flatten_nested(leaf_array)
-        for value in values:
-          binary_scalar_len = int(np.log2(max(value.as_buffer().size, 1)))
-          distinct_count[binary_scalar_len] += 1
-        for k, v in distinct_count.items():
+        # Bucket the values by floor(log2(byte length)) in one vectorized pass
+        # rather than boxing every value into a scalar.
+        binary_scalar_lens = np.log2(
+            np.maximum(array_util.GetElementLengths(values).to_numpy(),
+                       1)).astype(np.int64)
+        for k, v in zip(*np.unique(binary_scalar_lens, return_counts=True)):
           beam.metrics.Metrics.counter(constants.METRICS_NAMESPACE,
-                                       "binary_scalar_len_" + str(k)).inc(v)
+                                       "binary_scalar_len_" + str(k)).inc(
+                                           int(v))
 
     for feature_path, leaf_array, weights in arrow_util.enumerate_arrays(
         input_record_batch,
@@ -19,8 +19,11 @@ from __future__ import print_function
 
 from absl.testing import absltest
 from absl.testing import parameterized
+import apache_beam as beam
 import pyarrow as pa
 from tensorflow_data_validation import types
+from tensorflow_data_validation.statistics import stats_impl
+from tensorflow_data_validation.statistics import stats_options
 from tensorflow_data_validation.statistics.generators import top_k_uniques_sketch_stats_generator as sketch_generator
 from tensorflow_data_validation.utils import test_util
 from tensorflow_data_validation.utils.example_weight_map import ExampleWeightMap
@@ -1512,5 +1515,49 @@ class TopKUniquesSketchStatsGeneratorTest(test_util.CombinerStatsGeneratorTest,
         length_counter_sampling_rate=1)
     self.assertCombinerOutputEqual(batches, generator, expected_result)
 
+  def test_length_counters(self):
+    # Byte lengths 0 and 1 fall in bucket 0, 2 and 3 in bucket 1 and 8 in
+    # bucket 3 (floor(log2(max(length, 1)))).
+    record_batches = [
+        pa.RecordBatch.from_arrays([
+            pa.array([[b'', b'a'], [b'ab']], type=pa.list_(pa.binary())),
+        ], ['fa']),
+        pa.RecordBatch.from_arrays([
+            pa.array([[b'abc', b'abcdefgh']], type=pa.list_(pa.binary())),
+        ], ['fa']),
+    ]
+    generator = sketch_generator.TopKUniquesSketchStatsGenerator(
+        length_counter_sampling_rate=1)
+    options = stats_options.StatsOptions(
+        generators=[generator], add_default_generators=False)
+
+    p = beam.Pipeline()
+    _ = (
+        p
+        | 'CreateBatches' >> beam.Create(record_batches, reshuffle=False)
+        | 'GenerateStatsImpl' >> stats_impl.GenerateStatisticsImpl(options))
+
+    runner = p.run()
+    runner.wait_until_finish()
+    result_metrics = runner.metrics()
+
+    expected_result = {
+        'binary_scalar_len_0': 2,
+        'binary_scalar_len_1': 2,
+        'binary_scalar_len_3': 1,
+    }
+
+    for counter_name in expected_result:
+      actual_counter = result_metrics.query(
+          beam.metrics.metric.MetricsFilter().with_name(counter_name)
+          )['counters']
+      self.assertLen(actual_counter, 1)
+      self.assertEqual(actual_counter[0].committed,
+                       expected_result[counter_name])
+    # No value has a byte length in [4, 8).
+    self.assertEmpty(
+        result_metrics.query(beam.metrics.metric.MetricsFilter().with_name(
+            'binary_scalar_len_2'))['counters'])
+
 if __name__ == '__main__':
   absltest.main()
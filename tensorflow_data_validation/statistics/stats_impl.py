@@ -51,6 +51,10 @@ from tensorflow_metadata.proto.v0 import statistics_pb2
 _DEFAULT_MG_SKETCH_SIZE = 1024
 _DEFAULT_KMV_SKETCH_SIZE = 16384
 
+# Maximum number of input accumulators whose partial accumulators are merged
+# together by _CombinerStatsGeneratorsCombineFn.merge_accumulators.
+_MERGE_ACCUMULATORS_GROUP_SIZE = 8
+
 
 class GenerateStatisticsImpl(beam.PTransform):
   """PTransform that applies a set of generators over input examples."""
@@ -645,9 +649,12 @@ class _CombinerStatsGeneratorsCombineFn(beam.CombineFn):
       else:
         record_batch = table_util.MergeRecordBatches(
             accumulator.input_record_batches)
-      accumulator.partial_accumulators = self._for_each_generator(
-          lambda gen, gen_acc: gen.add_input(gen_acc, record_batch),
-          accumulator.partial_accumulators)
+      # This is the per-batch hot path, so call add_input directly instead of
+      # going through _for_each_generator and a lambda.
+      accumulator.partial_accumulators = [
+          gen.add_input(gen_acc, record_batch) for gen, gen_acc in zip(
+              self._generators, accumulator.partial_accumulators)
+      ]
       del accumulator.input_record_batches[:]
       accumulator.curr_batch_size = 0
       accumulator.curr_byte_size = 0
@@ -673,21 +680,37 @@ class _CombinerStatsGeneratorsCombineFn(beam.CombineFn):
     self._num_instances.inc(num_rows)
     return accumulator
 
+  def _merge_partial_accumulators(
+      self, result: _CombinerStatsGeneratorsCombineFnAcc,
+      partial_accumulators_to_merge: List[List[Any]]) -> None:
+    """Merges the given partial accumulators into `result`, in place."""
+    result.partial_accumulators = self._for_each_generator(
+        lambda gen, accs: gen.merge_accumulators(accs),
+        zip(result.partial_accumulators, *partial_accumulators_to_merge))
+
   def merge_accumulators(
       self,
       accumulators: Iterable[_CombinerStatsGeneratorsCombineFnAcc]
       ) -> _CombinerStatsGeneratorsCombineFnAcc:
     it = iter(accumulators)
     result = next(it)
+    # The partial accumulators of the inputs are merged in bounded groups, so
+    # that at most _MERGE_ACCUMULATORS_GROUP_SIZE inputs' sketches are kept
+    # alive at a time even when `accumulators` is a large lazy iterable.
+    partial_accumulators_to_merge = []
     for accumulator in it:
       result.input_record_batches.extend(accumulator.input_record_batches)
       result.curr_batch_size += accumulator.curr_batch_size
       result.curr_byte_size += accumulator.curr_byte_size
       self._maybe_do_batch(result)
-      result.partial_accumulators = self._for_each_generator(
-          lambda gen, x, y: gen.merge_accumulators([x, y]),
-          result.partial_accumulators,
-          accumulator.partial_accumulators)
+      partial_accumulators_to_merge.append(accumulator.partial_accumulators)
+      if len(partial_accumulators_to_merge) >= _MERGE_ACCUMULATORS_GROUP_SIZE:
+        self._merge_partial_accumulators(result,
+                                         partial_accumulators_to_merge)
+        partial_accumulators_to_merge = []
+
+    if partial_accumulators_to_merge:
+      self._merge_partial_accumulators(result, partial_accumulators_to_merge)
 
     return result
 
@@ -885,14 +908,27 @@ class CombinerFeatureStatsWrapperGenerator(
     Returns:
       The merged accumulator.
     """
-    result = self.create_accumulator()
+    # Group the accumulators by feature first so that each wrapped generator's
+    # merge_accumulators is called once per feature, instead of once per
+    # (feature, wrapper_accumulator) pair.
+    accumulators_by_feature = {}
     for wrapper_accumulator in wrapper_accumulators:
       for feature_path, accumulator_for_feature in wrapper_accumulator.items():
-        wrapped_accumulators = self._get_wrapped_accumulators(
-            result, feature_path)
-        for index, generator in enumerate(self._feature_stats_generators):
-          wrapped_accumulators[index] = generator.merge_accumulators(
-              [wrapped_accumulators[index], accumulator_for_feature[index]])
+        accumulators_for_feature = accumulators_by_feature.get(feature_path)
+        if accumulators_for_feature is None:
+          accumulators_for_feature = []
+          accumulators_by_feature[feature_path] = accumulators_for_feature
+        accumulators_for_feature.append(accumulator_for_feature)
+
+    result = self.create_accumulator()
+    for feature_path, accumulators_for_feature in (
+        accumulators_by_feature.items()):
+      wrapped_accumulators = self._get_wrapped_accumulators(
+          result, feature_path)
+      for index, generator in enumerate(self._feature_stats_generators):
+        wrapped_accumulators[index] = generator.merge_accumulators(
+            [wrapped_accumulators[index]] +
+            [accumulator[index] for accumulator in accumulators_for_feature])
     return result
 
   def compact(self,
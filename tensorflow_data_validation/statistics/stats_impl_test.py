@@ -18,6 +18,7 @@ from __future__ import division
 from __future__ import print_function
 
 import copy
+import functools
 import sys
 from typing import Iterable
 import unittest
@@ -68,10 +69,17 @@ class _ValueCounter(_BaseCounter):
   """A _BaseCounter that counts number of values."""
 
   def add_input(self, accumulator, feature_path, feature_array):
-    num_values = array_util.ListLengthsFromListArray(feature_array).to_numpy()
-    none_mask = array_util.GetArrayNullBitmapAsByteArray(
-        feature_array).to_numpy().view(bool)
-    accumulator += np.sum(num_values[~none_mask])
+    if pa.types.is_null(feature_array.type):
+      return accumulator
+    # The total number of values is the span of the offsets, less the lengths
+    # of the (typically few) null lists.
+    offsets = np.asarray(feature_array.offsets)
+    accumulator += int(offsets[-1] - offsets[0])
+    if feature_array.null_count:
+      null_indices = np.flatnonzero(
+          array_util.GetArrayNullBitmapAsByteArray(feature_array).to_numpy())
+      accumulator -= int(
+          np.sum(offsets[null_indices + 1] - offsets[null_indices]))
     return accumulator
 
 
@@ -107,6 +115,35 @@ class _CompactIndicator(stats_generator.CombinerFeatureStatsGenerator):
     return result
 
 
+# Large int64 lists shared by the record batches of several testcases.
+_INT_VALUES_1 = np.arange(1, 501, dtype=np.int64)
+_INT_VALUES_2 = np.arange(501, 1251, dtype=np.int64)
+_INT_VALUES_3 = np.arange(1251, 3001, dtype=np.int64)
+
+
+# Generate 100 examples to pass threshold for semantic domains:
+# - Replicate an example passing checks 90 times
+# - Replicate an example not passing checks 10 times
+_SEMANTIC_DOMAINS_TEST_RECORD_BATCHES = [
+    pa.RecordBatch.from_arrays(
+        [
+            pa.array([[b'This should be natural text']],
+                     type=pa.list_(pa.binary())),
+            # The png magic header, this should be considered an
+            # "image".
+            pa.array([[b'\211PNG\r\n\032\n']],
+                     type=pa.list_(pa.binary())),
+        ],
+        ['text_feature', 'image_feature']),
+] * 90 + [
+    pa.RecordBatch.from_arrays([
+        pa.array([[b'Thisshouldnotbenaturaltext']],
+                 type=pa.list_(pa.binary())),
+        pa.array([[b'Thisisnotanimage']], type=pa.list_(pa.binary())),
+    ], ['text_feature', 'image_feature']),
+] * 10
+
+
 _GENERATE_STATS_TESTS = [
     {
         'testcase_name':
@@ -116,20 +153,20 @@ _GENERATE_STATS_TESTS = [
                 pa.array([[1.0, 2.0]], type=pa.list_(pa.float32())),
                 pa.array([[b'a', b'b', b'c', b'e']], type=pa.list_(
                     pa.binary())),
-                pa.array([np.linspace(1, 500, 500, dtype=np.int64)]),
+                pa.array([_INT_VALUES_1]),
             ], ['a', 'b', 'c']),
             pa.RecordBatch.from_arrays([
                 pa.array([[3.0, 4.0, np.NaN, 5.0]], type=pa.list_(
                     pa.float32())),
                 pa.array([[b'a', b'c', b'd', b'a']], type=pa.list_(
                     pa.binary())),
-                pa.array([np.linspace(501, 1250, 750, dtype=np.int64)]),
+                pa.array([_INT_VALUES_2]),
             ], ['a', 'b', 'c']),
             pa.RecordBatch.from_arrays([
                 pa.array([[1.0]], type=pa.list_(pa.float32())),
                 pa.array([[b'a', b'b', b'c', b'd']], type=pa.list_(
                     pa.binary())),
-                pa.array([np.linspace(1251, 3000, 1750, dtype=np.int64)]),
+                pa.array([_INT_VALUES_3]),
             ], ['a', 'b', 'c'])
         ],
         'options':
@@ -674,27 +711,7 @@ _GENERATE_STATS_TESTS = [
     {
         'testcase_name':
             'semantic_domains_enabled',
-        # Generate 100 examples to pass threshold for semantic domains:
-        # - Replicate an example passing checks 90 times
-        # - Replicate an example not passing checks 10 times
-        'record_batches': [
-            pa.RecordBatch.from_arrays(
-                [
-                    pa.array([[b'This should be natural text']],
-                             type=pa.list_(pa.binary())),
-                    # The png magic header, this should be considered an
-                    # "image".
-                    pa.array([[b'\211PNG\r\n\032\n']],
-                             type=pa.list_(pa.binary())),
-                ],
-                ['text_feature', 'image_feature']),
-        ] * 90 + [
-            pa.RecordBatch.from_arrays([
-                pa.array([[b'Thisshouldnotbenaturaltext']],
-                         type=pa.list_(pa.binary())),
-                pa.array([[b'Thisisnotanimage']], type=pa.list_(pa.binary())),
-            ], ['text_feature', 'image_feature']),
-        ] * 10,
+        'record_batches': _SEMANTIC_DOMAINS_TEST_RECORD_BATCHES,
         'options':
             stats_options.StatsOptions(
                 num_top_values=4,
@@ -819,24 +836,7 @@ _GENERATE_STATS_TESTS = [
     {
         'testcase_name':
             'semantic_domains_disabled',
-        'record_batches': [
-            pa.RecordBatch.from_arrays(
-                [
-                    pa.array([[b'This should be natural text']],
-                             type=pa.list_(pa.binary())),
-                    # The png magic header, this should be considered an
-                    # "image".
-                    pa.array([[b'\211PNG\r\n\032\n']],
-                             type=pa.list_(pa.binary())),
-                ],
-                ['text_feature', 'image_feature']),
-        ] * 90 + [
-            pa.RecordBatch.from_arrays([
-                pa.array([[b'Thisshouldnotbenaturaltext']],
-                         type=pa.list_(pa.binary())),
-                pa.array([[b'Thisisnotanimage']], type=pa.list_(pa.binary())),
-            ], ['text_feature', 'image_feature']),
-        ] * 10,
+        'record_batches': _SEMANTIC_DOMAINS_TEST_RECORD_BATCHES,
         'options':
             stats_options.StatsOptions(
                 num_top_values=4,
@@ -1890,17 +1890,17 @@ _SLICE_TEST_RECORD_BATCHES = [
     pa.RecordBatch.from_arrays([
         pa.array([[1.0, 2.0]], type=pa.list_(pa.float32())),
         pa.array([[b'a']], type=pa.list_(pa.binary())),
-        pa.array([np.linspace(1, 500, 500, dtype=np.int64)]),
+        pa.array([_INT_VALUES_1]),
     ], ['a', 'b', 'c']),
     pa.RecordBatch.from_arrays([
         pa.array([[3.0, 4.0, np.NaN, 5.0]], type=pa.list_(pa.float32())),
         pa.array([[b'a', b'b']], type=pa.list_(pa.binary())),
-        pa.array([np.linspace(501, 1250, 750, dtype=np.int64)]),
+        pa.array([_INT_VALUES_2]),
     ], ['a', 'b', 'c']),
     pa.RecordBatch.from_arrays([
         pa.array([[1.0]], type=pa.list_(pa.float32())),
         pa.array([[b'b']], type=pa.list_(pa.binary())),
-        pa.array([np.linspace(1251, 3000, 1750, dtype=np.int64)]),
+        pa.array([_INT_VALUES_3]),
     ], ['a', 'b', 'c'])
 ]
 
@@ -2014,18 +2014,18 @@ _SLICING_SQL_TESTS = [
             pa.RecordBatch.from_arrays([
                 pa.array([[1.0, 2.0]], type=pa.list_(pa.float32())),
                 pa.array([[b'a']], type=pa.list_(pa.binary())),
-                pa.array([np.linspace(1, 500, 500, dtype=np.int64)]),
+                pa.array([_INT_VALUES_1]),
             ], ['a', 'b', 'c']),
             pa.RecordBatch.from_arrays([
                 pa.array([[3.0, 4.0, np.NaN, 5.0]], type=pa.list_(
                     pa.float32())),
                 pa.array([[b'a', b'b']], type=pa.list_(pa.binary())),
-                pa.array([np.linspace(501, 1250, 750, dtype=np.int64)]),
+                pa.array([_INT_VALUES_2]),
             ], ['a', 'b', 'c']),
             pa.RecordBatch.from_arrays([
                 pa.array([[1.0]], type=pa.list_(pa.float32())),
                 pa.array([[b'b']], type=pa.list_(pa.binary())),
-                pa.array([np.linspace(1251, 3000, 1750, dtype=np.int64)]),
+                pa.array([_INT_VALUES_3]),
             ], ['a', 'b', 'c'])
         ],
         'options':
@@ -2071,6 +2071,20 @@ def _merge_shards(
   return merge_util.merge_dataset_feature_statistics(_flatten(shards))
 
 
+@functools.lru_cache(maxsize=None)
+def _serialize_stats_list_proto_text(proto_text: str) -> bytes:
+  return text_format.Parse(
+      proto_text,
+      statistics_pb2.DatasetFeatureStatisticsList()).SerializeToString()
+
+
+def _parse_stats_list_proto_text(
+    proto_text: str) -> statistics_pb2.DatasetFeatureStatisticsList:
+  """Parses a text proto once, returning a fresh copy on each call."""
+  return statistics_pb2.DatasetFeatureStatisticsList.FromString(
+      _serialize_stats_list_proto_text(proto_text))
+
+
 class StatsImplTest(parameterized.TestCase):
 
   @parameterized.named_parameters(
@@ -2085,10 +2099,10 @@ class StatsImplTest(parameterized.TestCase):
                       expected_result_proto_text,
                       expected_shards=1,
                       schema=None):
-    expected_result = text_format.Parse(
-        expected_result_proto_text,
-        statistics_pb2.DatasetFeatureStatisticsList())
+    expected_result = _parse_stats_list_proto_text(expected_result_proto_text)
     if schema is not None:
+      # The testcases are shared across tests, so don't modify their options.
+      options = copy.deepcopy(options)
       options.schema = schema
     with beam.Pipeline() as p:
       result = (
@@ -2118,18 +2132,18 @@ class StatsImplTest(parameterized.TestCase):
         pa.RecordBatch.from_arrays([
             pa.array([[1.0, 2.0]], type=pa.list_(pa.float32())),
             pa.array([[b'a']], type=pa.list_(pa.binary())),
-            pa.array([np.linspace(1, 500, 500, dtype=np.int64)]),
+            pa.array([_INT_VALUES_1]),
         ], ['a', 'b', 'c']),
         pa.RecordBatch.from_arrays([
             pa.array([[3.0, 4.0, np.NaN, 5.0]], type=pa.list_(
                 pa.float32())),
             pa.array([[b'a', b'b']], type=pa.list_(pa.binary())),
-            pa.array([np.linspace(501, 1250, 750, dtype=np.int64)]),
+            pa.array([_INT_VALUES_2]),
         ], ['a', 'b', 'c']),
         pa.RecordBatch.from_arrays([
             pa.array([[1.0]], type=pa.list_(pa.float32())),
             pa.array([[b'b']], type=pa.list_(pa.binary())),
-            pa.array([np.linspace(1251, 3000, 1750, dtype=np.int64)]),
+            pa.array([_INT_VALUES_3]),
         ], ['a', 'b', 'c'])
     ]
     options = stats_options.StatsOptions(
@@ -2169,18 +2183,18 @@ class StatsImplTest(parameterized.TestCase):
         pa.RecordBatch.from_arrays([
             pa.array([[1.0, 2.0]], type=pa.list_(pa.float32())),
             pa.array([[b'a']], type=pa.list_(pa.binary())),
-            pa.array([np.linspace(1, 500, 500, dtype=np.int64)]),
+            pa.array([_INT_VALUES_1]),
         ], ['a', 'b', 'c']),
         pa.RecordBatch.from_arrays([
             pa.array([[3.0, 4.0, np.NaN, 5.0]], type=pa.list_(
                 pa.float32())),
             pa.array([[b'a', b'b']], type=pa.list_(pa.binary())),
-            pa.array([np.linspace(501, 1250, 750, dtype=np.int64)]),
+            pa.array([_INT_VALUES_2]),
         ], ['a', 'b', 'c']),
         pa.RecordBatch.from_arrays([
             pa.array([[1.0]], type=pa.list_(pa.float32())),
             pa.array([[b'b']], type=pa.list_(pa.binary())),
-            pa.array([np.linspace(1251, 3000, 1750, dtype=np.int64)]),
+            pa.array([_INT_VALUES_3]),
         ], ['a', 'b', 'c'])
     ]
     options = stats_options.StatsOptions(
@@ -2351,10 +2365,10 @@ class StatsImplTest(parameterized.TestCase):
                                          options,
                                          expected_result_proto_text,
                                          schema=None):
-    expected_result = text_format.Parse(
-        expected_result_proto_text,
-        statistics_pb2.DatasetFeatureStatisticsList())
+    expected_result = _parse_stats_list_proto_text(expected_result_proto_text)
     if schema is not None:
+      # The testcases are shared across tests, so don't modify their options.
+      options = copy.deepcopy(options)
       options.schema = schema
     result = stats_impl.generate_statistics_in_memory(
         table_util.MergeRecordBatches(record_batches), options)
@@ -2575,6 +2589,40 @@ class StatsImplTest(parameterized.TestCase):
         'TransformStatsGenerator.'):
       stats_impl.generate_statistics_in_memory(record_batch, options)
 
+  def test_incomplete_combiner_stats_generator_raises(self):
+
+    # Does not implement merge_accumulators.
+    class IncompleteGenerator(stats_generator.CombinerStatsGenerator):
+
+      def create_accumulator(self):
+        return 0
+
+      def add_input(self, accumulator, input_record_batch):
+        return accumulator
+
+      def extract_output(self, accumulator):
+        return statistics_pb2.DatasetFeatureStatistics()
+
+    with self.assertRaisesRegex(TypeError, 'merge_accumulators'):
+      IncompleteGenerator(name='IncompleteGenerator')
+
+  def test_incomplete_combiner_feature_stats_generator_raises(self):
+
+    # Does not implement merge_accumulators.
+    class IncompleteGenerator(stats_generator.CombinerFeatureStatsGenerator):
+
+      def create_accumulator(self):
+        return 0
+
+      def add_input(self, accumulator, feature_path, feature_array):
+        return accumulator
+
+      def extract_output(self, accumulator):
+        return statistics_pb2.FeatureNameStatistics()
+
+    with self.assertRaisesRegex(TypeError, 'merge_accumulators'):
+      IncompleteGenerator(name='IncompleteGenerator')
+
   # Note: these tests partially duplicate tfx_bsl merge tests.
   def test_merge_dataset_feature_stats_protos(self):
     proto1 = text_format.Parse(
@@ -2653,24 +2701,9 @@ class StatsImplTest(parameterized.TestCase):
         }
         """, statistics_pb2.DatasetFeatureStatistics())
 
-    expected = text_format.Parse(
-        """
-        num_examples: 7
-        features: {
-          path {
-            step: "feature1"
-          }
-          type: STRING
-          string_stats: {
-            common_stats: {
-              num_missing: 3
-              num_non_missing: 4
-              min_num_values: 1
-              max_num_values: 1
-            }
-          }
-        }
-        """, statistics_pb2.DatasetFeatureStatistics())
+    # Merging a single proto should return it unchanged.
+    expected = statistics_pb2.DatasetFeatureStatistics()
+    expected.CopyFrom(proto1)
 
     actual = _get_singleton_dataset(
         merge_util.merge_dataset_feature_statistics([proto1]))
@@ -2744,6 +2777,127 @@ class StatsImplTest(parameterized.TestCase):
       self.assertEqual(actual_counter[0].committed,
                        expected_result[counter_name])
 
+  def test_combiner_feature_stats_wrapper_generator_merge_accumulators(self):
+    record_batches = [
+        pa.RecordBatch.from_arrays([
+            pa.array([[b'x', b'y']], type=pa.list_(pa.binary())),
+        ], ['a']),
+        pa.RecordBatch.from_arrays([
+            pa.array([[b'z']], type=pa.list_(pa.binary())),
+            pa.array([[b'w']], type=pa.list_(pa.binary())),
+        ], ['a', 'b']),
+        pa.RecordBatch.from_arrays([
+            pa.array([None, [b'u', b'v']], type=pa.list_(pa.binary())),
+        ], ['b']),
+    ]
+    generator = stats_impl.CombinerFeatureStatsWrapperGenerator(
+        [_ValueCounter(), _ExampleCounter()])
+    accumulators = [
+        generator.add_input(generator.create_accumulator(), record_batch)
+        for record_batch in record_batches
+    ]
+    actual = generator.extract_output(
+        generator.merge_accumulators(accumulators))
+    expected = text_format.Parse(
+        """
+        features {
+          path {
+            step: "a"
+          }
+          custom_stats {
+            name: "_ValueCounter"
+            num: 3.0
+          }
+          custom_stats {
+            name: "_ExampleCounter"
+            num: 2.0
+          }
+        }
+        features {
+          path {
+            step: "b"
+          }
+          custom_stats {
+            name: "_ValueCounter"
+            num: 3.0
+          }
+          custom_stats {
+            name: "_ExampleCounter"
+            num: 2.0
+          }
+        }
+        """, statistics_pb2.DatasetFeatureStatistics())
+    test_util.assert_dataset_feature_stats_proto_equal(self, actual, expected)
+
+  def test_combiner_stats_generators_combine_fn_merge_accumulators(self):
+    record_batches = [
+        pa.RecordBatch.from_arrays([
+            pa.array([[b'x', b'y']], type=pa.list_(pa.binary())),
+        ], ['a']),
+        pa.RecordBatch.from_arrays([
+            pa.array([[b'z']], type=pa.list_(pa.binary())),
+        ], ['a']),
+        pa.RecordBatch.from_arrays([
+            pa.array([None, [b'u', b'v', b'w']], type=pa.list_(pa.binary())),
+        ], ['a']),
+    ]
+    combine_fn = stats_impl._CombinerStatsGeneratorsCombineFn(
+        [stats_impl.CombinerFeatureStatsWrapperGenerator([_ValueCounter()])],
+        desired_batch_size=1)
+    combine_fn.setup()
+    accumulators = [
+        combine_fn.add_input(combine_fn.create_accumulator(), record_batch)
+        for record_batch in record_batches
+    ]
+    actual = combine_fn.extract_output(
+        combine_fn.merge_accumulators(accumulators))
+    expected = text_format.Parse(
+        """
+        features {
+          path {
+            step: "a"
+          }
+          custom_stats {
+            name: "_ValueCounter"
+            num: 6.0
+          }
+        }
+        """, statistics_pb2.DatasetFeatureStatistics())
+    test_util.assert_dataset_feature_stats_proto_equal(self, actual, expected)
+
+  def test_combiner_stats_generators_combine_fn_merge_accumulators_iterable(
+      self):
+    record_batch = pa.RecordBatch.from_arrays([
+        pa.array([[b'x', b'y']], type=pa.list_(pa.binary())),
+    ], ['a'])
+    combine_fn = stats_impl._CombinerStatsGeneratorsCombineFn(
+        [stats_impl.CombinerFeatureStatsWrapperGenerator([_ValueCounter()])],
+        desired_batch_size=1)
+    combine_fn.setup()
+    # Beam may pass the accumulators as a one-shot iterable. Use more inputs
+    # than _MERGE_ACCUMULATORS_GROUP_SIZE so that several groups are merged.
+    num_accumulators = 20
+    self.assertLess(stats_impl._MERGE_ACCUMULATORS_GROUP_SIZE,
+                    num_accumulators)
+    accumulators = (
+        combine_fn.add_input(combine_fn.create_accumulator(), record_batch)
+        for _ in range(num_accumulators))
+    actual = combine_fn.extract_output(
+        combine_fn.merge_accumulators(accumulators))
+    expected = text_format.Parse(
+        """
+        features {
+          path {
+            step: "a"
+          }
+          custom_stats {
+            name: "_ValueCounter"
+            num: 40.0
+          }
+        }
+        """, statistics_pb2.DatasetFeatureStatistics())
+    test_util.assert_dataset_feature_stats_proto_equal(self, actual, expected)
+
   def test_filter_features(self):
     input_record_batch = pa.RecordBatch.from_arrays([
         pa.array([[]], type=pa.list_(pa.int64())),
@@ -2755,7 +2909,7 @@ class StatsImplTest(parameterized.TestCase):
         pa.array([[]], type=pa.list_(pa.int64())),
         pa.array([[]], type=pa.list_(pa.int64())),
     ], ['a', 'c'])
-    self.assertEqual(set(actual.schema.names), set(expected.schema.names))
+    self.assertCountEqual(actual.schema.names, expected.schema.names)
 
   def test_filter_features_empty(self):
     input_record_batch = pa.RecordBatch.from_arrays([
@@ -2763,7 +2917,7 @@ class StatsImplTest(parameterized.TestCase):
     ], ['a'])
     actual = stats_impl._filter_features(input_record_batch, [])
     expected = pa.RecordBatch.from_arrays([])
-    self.assertEqual(set(actual.schema.names), set(expected.schema.names))
+    self.assertCountEqual(actual.schema.names, expected.schema.names)
 
 
 if __name__ == '__main__':